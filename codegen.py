@@ -0,0 +1,133 @@
+# codegen.py
+# Prevođenje naredbi (opcode IR iz Parser-a) u jednu Python funkciju.
+
+from __future__ import annotations
+from typing import Callable, Dict, List
+from lang_types import ClassDef, Instance
+
+
+class ProgramCompiler:
+    """
+    Od liste prevedenih naredbi pravi pravolinijsku Python funkciju
+    program(insts, views, out), sa jednom ili dve linije po naredbi
+    (jezik nema petlje ni grananja). Funkcija radi nad listama
+    okruženja istog oblika kao Interpreter.insts/views, a izlazne
+    linije predaje funkciji out.
+
+    Prevođenje košta više od jednog izvršavanja kroz Interpreter.run(),
+    pa se isplati samo kada se isti program izvršava više puta.
+    """
+
+    def __init__(self, statements: List[tuple]):
+        self.statements = statements
+        # objekti (klase) koje koristi generisani kod: ime -> objekat,
+        # i obrnuto id(objekta) -> ime, da svaki objekat dobije jedno ime
+        self._consts: Dict[str, object] = {}
+        self._const_names: Dict[int, str] = {}
+        # tabela skokova: opcode -> generisanje koda (kao Interpreter._dispatch)
+        self._emitters = [
+            self._emit_let_new,       # OP_LET_NEW
+            self._emit_let_clone,     # OP_LET_CLONE
+            self._emit_let_cast,      # OP_LET_CAST
+            self._emit_let_alias,     # OP_LET_ALIAS
+            self._emit_field_assign,  # OP_FIELD_ASSIGN
+            self._emit_call,          # OP_CALL
+            self._emit_is,            # OP_IS
+        ]
+
+    def compile(self) -> Callable[..., None]:
+        """
+        Generiše izvorni kod funkcije i prevodi ga.
+        """
+        body: List[str] = []
+        for op in self.statements:
+            body.extend(self._emitters[op[0]](op))
+        src = "def _program(insts, views, out):\n"
+        src += "".join(f"    {line}\n" for line in body) or "    pass\n"
+
+        namespace: Dict[str, object] = {"Instance": Instance, **self._consts}
+        exec(compile(src, "<program>", "exec"), namespace)
+        return namespace["_program"]
+
+    def _const(self, obj: ClassDef) -> str:
+        """
+        Vraća ime pod kojim generisani kod vidi zadati objekat.
+        """
+        name = self._const_names.get(id(obj))
+        if name is None:
+            name = f"_k{len(self._consts)}"
+            self._consts[name] = obj
+            self._const_names[id(obj)] = name
+        return name
+
+    # ------------- generisanje koda po naredbi -------------
+
+    def _emit_let_new(self, op: tuple) -> List[str]:
+        """
+        Kod za 'let a = new A(1, 2, 3, 4)'.
+        """
+        _, idx, cls, args = op
+        c = self._const(cls)
+        return [
+            f"insts[{idx}] = Instance({c}, {list(args)!r})",
+            f"views[{idx}] = {c}",
+        ]
+
+    def _emit_let_clone(self, op: tuple) -> List[str]:
+        """
+        Kod za 'let c = clone a'.
+        """
+        _, idx, src = op
+        return [
+            f"insts[{idx}] = Instance(insts[{src}].cls, insts[{src}].fields.copy())",
+            f"views[{idx}] = views[{src}]",
+        ]
+
+    def _emit_let_cast(self, op: tuple) -> List[str]:
+        """
+        Kod za 'let c = cast<B> a'.
+        """
+        _, idx, target_cls, src = op
+        return [
+            f"insts[{idx}] = insts[{src}]",
+            f"views[{idx}] = {self._const(target_cls)}",
+        ]
+
+    def _emit_let_alias(self, op: tuple) -> List[str]:
+        """
+        Kod za 'let b = a'.
+        """
+        _, idx, src = op
+        return [
+            f"insts[{idx}] = insts[{src}]",
+            f"views[{idx}] = views[{src}]",
+        ]
+
+    def _emit_field_assign(self, op: tuple) -> List[str]:
+        """
+        Kod za 'a.a = 5'.
+        """
+        _, idx, slot, value = op
+        return [f"insts[{idx}].fields[{slot}] = {value}"]
+
+    def _emit_call(self, op: tuple) -> List[str]:
+        """
+        Kod za 'call a.showAll'.
+        """
+        _, idx, tmpl = op
+        # šablon bez polja je gotova linija
+        if "{" not in tmpl:
+            return [f"out({tmpl!r})"]
+        return [f"out({tmpl!r}.format(*insts[{idx}].fields))"]
+
+    def _emit_is(self, op: tuple) -> List[str]:
+        """
+        Kod za 'a is A'.
+        """
+        _, idx, cls = op
+        if idx is None or cls is None:
+            return ['out("ISN\'T\\n")']
+        return [
+            f"out(\"IS\\n\" if insts[{idx}].cls.is_subclass_of({self._const(cls)}) "
+            f"else \"ISN'T\\n\")"
+        ]
@@ -2,261 +2,158 @@
 # Interpreter koji izvršava naredbe, sa "view" tipom (cast) i deljenjem instanci.
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List
-from lang_types import ClassDef, Instance, is_int
-
-
-@dataclass
-class VarBinding:
-    """
-    Veza promenljive u okruženju.
-
-    inst     - konkretan objekat (runtime instanca)
-    view_cls - klasa kroz koju ga posmatramo (npr. cast<B> A)
-               koristi se za pronalaženje metoda.
-    """
-    inst: Instance
-    view_cls: ClassDef
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+from codegen import ProgramCompiler
+from lang_types import ClassDef, Instance
 
 
 class Interpreter:
-    def __init__(self, classes: Dict[str, ClassDef], statements: List[str]):
+    def __init__(
+        self,
+        classes: Dict[str, ClassDef],
+        statements: List[tuple],
+        var_names: List[str],
+    ):
         self.classes = classes
         self.statements = statements
-        # env: ime promenljive -> (instanca, view klasa)
-        self.env: Dict[str, VarBinding] = {}
+        # imena promenljivih po indeksu, treba samo za ispis
+        self.var_names = var_names
+        # Okruženje kao dve paralelne liste po indeksu promenljive
+        # (indekse dodeljuje Parser, None znači da još nije vezana):
+        # insts - konkretan objekat (runtime instanca)
+        # views - klasa kroz koju ga posmatramo (npr. cast<B> A),
+        #         koristi se za pronalaženje metoda
+        self.insts: List[Optional[Instance]] = [None] * len(var_names)
+        self.views: List[Optional[ClassDef]] = [None] * len(var_names)
+        # izlaz naredbi se skuplja ovde i ispisuje odjednom na kraju run()
+        self._out_buf: List[str] = []
+        # tabela skokova: opcode -> obrada (indeks je vrednost OP_* koda)
+        self._dispatch = [
+            self._exec_let_new,       # OP_LET_NEW
+            self._exec_let_clone,     # OP_LET_CLONE
+            self._exec_let_cast,      # OP_LET_CAST
+            self._exec_let_alias,     # OP_LET_ALIAS
+            self._exec_field_assign,  # OP_FIELD_ASSIGN
+            self._exec_call,          # OP_CALL
+            self._exec_is,            # OP_IS
+        ]
 
     def run(self) -> None:
         """
-        Izvršava sve naredbe redom.
+        Izvršava sve (prevedene) naredbe redom.
+        Izlaz se ispisuje jednim upisom na kraju, i kada naredba prijavi grešku.
         """
-        for stmt in self.statements:
-            self._exec_statement(stmt)
+        dispatch = self._dispatch
+        try:
+            for op in self.statements:
+                dispatch[op[0]](op)
+        finally:
+            sys.stdout.write("".join(self._out_buf))
+            self._out_buf.clear()
 
-    def _exec_statement(self, stmt: str) -> None:
+    def compile_to_python(self) -> Callable[..., None]:
         """
-        Prepoznaje tip naredbe i delegira izvršavanje.
-        Uklanja komentare koji počinju sa ';'.
+        Prevodi sve naredbe u jednu pravolinijsku Python funkciju
+        program(insts, views, out) (vidi codegen.ProgramCompiler).
+        Koristi je main.py --bench za ponovljena izvršavanja.
         """
-        # ukloni krajnji komentar posle ';'
-        stmt = stmt.split(";", 1)[0].strip()
-        if not stmt:
-            return
-
-        if stmt.startswith("let "):
-            self._exec_let(stmt)
-            return
-
-        if "." in stmt and "=" in stmt and not stmt.startswith("call "):
-            self._exec_field_assign(stmt)
-            return
-
-        if stmt.startswith("call "):
-            self._exec_call(stmt)
-            return
-
-        if " is " in stmt:
-            self._exec_is(stmt)
-            return
-
-        raise ValueError(f"Unknown statement: {stmt}")
+        return ProgramCompiler(self.statements).compile()
 
     # ------------- let naredbe -------------
 
-    def _exec_let(self, stmt: str) -> None:
+    def _exec_let_new(self, op: tuple) -> None:
         """
-        Obrada naredbe 'let ime = izraz'.
-        Izrazi koje podržavamo:
-        - new A(...)
-        - clone a
-        - cast<B> a
-        - prosto referenciranje: let b = a
+        Obrada 'let a = new A(1, 2, 3, 4)'.
         """
-        # let name = expr
-        _, rest = stmt.split("let", 1)
-        name_part, expr_part = rest.split("=", 1)
-        var_name = name_part.strip()
-        expr = expr_part.strip()
+        _, idx, cls, args = op
+        self.insts[idx] = self._instantiate(cls, args)
+        # view tip je na početku ista kao runtime klasa
+        self.views[idx] = cls
 
-        # let a = new A(1, 2, 3, 4)
-        if expr.startswith("new "):
-            expr2 = expr[4:].strip()
-            cls_name, args_str = expr2.split("(", 1)
-            cls_name = cls_name.strip()
-            args_str = args_str.rsplit(")", 1)[0]
-            args: List[int] = []
-            if args_str.strip():
-                for tok in args_str.split(","):
-                    tok = tok.strip()
-                    if not is_int(tok):
-                        raise ValueError(
-                            "Only int literals allowed as constructor args"
-                        )
-                    args.append(int(tok))
-            inst = self._instantiate(cls_name, args)
-            # view tip je na početku ista kao runtime klasa
-            self.env[var_name] = VarBinding(inst=inst, view_cls=inst.cls)
-            return
+    def _exec_let_clone(self, op: tuple) -> None:
+        """
+        Obrada 'let c = clone a'.
+        """
+        _, idx, src = op
+        self.insts[idx] = self._clone(self.insts[src])
+        # clone dobija kopiju instance izvora, view klasa se nasleđuje od izvora
+        self.views[idx] = self.views[src]
 
-        # let c = clone a
-        if expr.startswith("clone "):
-            src_name = expr[6:].strip()
-            src_binding = self._get_binding(src_name)
-            new_inst = self._clone(src_binding.inst)
-            # clone dobija instancu izvora, view klasa se nasleđuje od view klase izvora
-            self.env[var_name] = VarBinding(
-                inst=new_inst,
-                view_cls=src_binding.view_cls,
-            )
-            return
+    def _exec_let_cast(self, op: tuple) -> None:
+        """
+        Obrada 'let c = cast<B> a'.
+        Upcast kao u Javi:
+        - ne pravi novi objekat,
+        - menja samo view tip (kroz koji tip gledamo na objekat).
 
-        # let c = cast<B> a
-        if expr.startswith("cast<"):
-            after_cast = expr[len("cast<"):]
-            type_part, rest2 = after_cast.split(">", 1)
-            target_cls_name = type_part.strip()
-            src_name = rest2.strip()
-            src_binding = self._get_binding(src_name)
-            new_binding = self._cast_binding(src_binding, target_cls_name)
-            self.env[var_name] = new_binding
-            return
+        Sam objekat ostaje isti, pa izmene preko jedne reference
+        vide i ostale reference. Da je cast dozvoljen, proverio je Parser.
+        """
+        _, idx, target_cls, src = op
+        self.insts[idx] = self.insts[src]
+        self.views[idx] = target_cls
 
-        # let b = a  nova promenljiva koja pokazuje na isti objekat i isti view
-        src_name = expr
-        src_binding = self._get_binding(src_name)
-        self.env[var_name] = VarBinding(
-            inst=src_binding.inst,
-            view_cls=src_binding.view_cls,
-        )
+    def _exec_let_alias(self, op: tuple) -> None:
+        """
+        Obrada 'let b = a' - nova promenljiva koja pokazuje
+        na isti objekat i isti view.
+        """
+        _, idx, src = op
+        self.insts[idx] = self.insts[src]
+        self.views[idx] = self.views[src]
 
-    def _exec_field_assign(self, stmt: str) -> None:
+    def _exec_field_assign(self, op: tuple) -> None:
         """
         Obrada 'a.a = 5' - dodela vrednosti polju.
+        Indeks polja je razrešen i proveren pri parsiranju.
         """
-        left, right = stmt.split("=", 1)
-        right = right.strip()
-        if not is_int(right):
-            raise ValueError("Only int literals allowed in field assignment")
-        value = int(right)
-
-        obj_part = left.strip()
-        var_name, field_name = [p.strip() for p in obj_part.split(".", 1)]
-        binding = self._get_binding(var_name)
-        inst = binding.inst
-
-        if field_name not in inst.fields:
-            raise ValueError(
-                f"Unknown field {field_name} "
-                f"for instance of {inst.cls.name}"
-            )
-        inst.fields[field_name] = value
+        _, idx, slot, value = op
+        self.insts[idx].fields[slot] = value
 
-    def _exec_call(self, stmt: str) -> None:
+    def _exec_call(self, op: tuple) -> None:
         """
         Obrada 'call a.showAll'.
-        Metodu tražimo kroz VIEW klasu, vrednosti čitamo iz inst.fields.
+        Metoda je već pronađena kroz VIEW klasu i pretvorena u šablon
+        pri prevođenju, vrednosti polja čitamo iz inst.fields.
         """
-        _, rest = stmt.split("call", 1)
-        rest = rest.strip()
-        var_part, method_name = [p.strip() for p in rest.split(".", 1)]
-        binding = self._get_binding(var_part)
-        inst = binding.inst
-        view_cls = binding.view_cls
-
-        # pretraga metoda u view tipu (cast<B> znači "posmatraj kao B")
-        tokens = view_cls.lookup_method(method_name)
-        if tokens is None:
-            raise ValueError(
-                f"Method {method_name} not found in view type {view_cls.name} "
-                f"or its bases"
-            )
-
-        values: List[int] = []
-        for tok in tokens:
-            if is_int(tok):
-                # literal se štampa direktno
-                values.append(int(tok))
-            else:
-                # tretiramo tok kao ime polja
-                if tok not in inst.fields:
-                    raise ValueError(
-                        f"Unknown field {tok} "
-                        f"in method {method_name}"
-                    )
-                values.append(inst.fields[tok])
-
-        print(" ".join(str(v) for v in values))
+        _, idx, tmpl = op
+        self._out_buf.append(tmpl.format(*self.insts[idx].fields))
 
     # ------------- is (instanceof) -------------
 
-    def _exec_is(self, stmt: str) -> None:
+    def _exec_is(self, op: tuple) -> None:
         """
         Obrada 'a is A'.
         Koristi stvarnu (runtime) klasu instance, kao instanceof u Javi.
         """
-        var_name, cls_name = [p.strip() for p in stmt.split(" is ", 1)]
-        binding = self.env.get(var_name)
-        cls = self.classes.get(cls_name)
-        if binding is None or cls is None:
-            print("ISN'T")
+        _, idx, cls = op
+        # idx je None za promenljivu koja nije definisana pre ove naredbe,
+        # cls je None za nepoznatu klasu
+        if idx is None or cls is None:
+            self._out_buf.append("ISN'T\n")
             return
-        inst = binding.inst
-        print("IS" if inst.cls.is_subclass_of(cls) else "ISN'T")
+        inst = self.insts[idx]
+        self._out_buf.append(
+            "IS\n" if inst.cls.is_subclass_of(cls) else "ISN'T\n"
+        )
 
     # ------------- pomoćne funkcije -------------
 
-    def _get_binding(self, name: str) -> VarBinding:
-        """
-        Pribavlja vezu promenljive iz okruženja.
-        """
-        if name not in self.env:
-            raise ValueError(f"Unknown variable {name}")
-        return self.env[name]
-
-    def _instantiate(self, class_name: str, args: List[int]) -> Instance:
+    def _instantiate(self, cls: ClassDef, args: Tuple[int, ...]) -> Instance:
         """
         Pravi novu instancu klase sa zadatim argumentima konstruktora.
-        Redosled argumenata prati all_fields baze pa izvedene klase.
+        Redosled argumenata prati all_fields baze pa izvedene klase;
+        broj argumenata je proveren pri parsiranju, pa se torka
+        argumenata samo kopira u listu polja (bez zip/dict).
         """
-        if class_name not in self.classes:
-            raise ValueError(f"Unknown class {class_name}")
-        cls = self.classes[class_name]
-        all_fields = cls.all_fields()
-        if len(all_fields) != len(args):
-            raise ValueError(
-                f"Class {class_name} expects {len(all_fields)} args, "
-                f"got {len(args)}"
-            )
-        fields = dict(zip(all_fields, args))
-        return Instance(cls=cls, fields=fields)
+        return Instance(cls, list(args))
 
     def _clone(self, inst: Instance) -> Instance:
         """
         Pravi novu instancu istog runtime tipa sa istim vrednostima polja.
         """
-        return Instance(cls=inst.cls, fields=dict(inst.fields))
-
-    def _cast_binding(self, binding: VarBinding, target_cls_name: str) -> VarBinding:
-        """
-        Upcast kao u Javi:
-        - ne pravi novi objekat,
-        - menja samo view tip (kroz koji tip gledamo na objekat).
-
-        Sam objekat ostaje isti, pa izmene preko jedne reference
-        vide i ostale reference.
-        """
-        if target_cls_name not in self.classes:
-            raise ValueError(f"Unknown class {target_cls_name}")
-        target_cls = self.classes[target_cls_name]
-
-        # Dozvoljeno samo ako je runtime klasa podklasa targeta.
-        if not binding.inst.cls.is_subclass_of(target_cls):
-            raise ValueError(
-                f"Cannot cast {binding.inst.cls.name} to {target_cls.name}"
-            )
-
-        return VarBinding(inst=binding.inst, view_cls=target_cls)
+        return Instance(inst.cls, inst.fields.copy())
 
     def print_classes(self) -> None:
         """
@@ -288,18 +185,23 @@ class Interpreter:
         - metode koje se vide kroz view tip.
         """
         print("=== Instances ===")
-        if not self.env:
+        bound = {
+            name: (inst, view_cls)
+            for name, inst, view_cls in zip(self.var_names, self.insts, self.views)
+            if inst is not None
+        }
+        if not bound:
             print("(no instances)")
             return
 
-        for var_name in sorted(self.env.keys()):
-            binding = self.env[var_name]
-            inst = binding.inst
-            view_cls = binding.view_cls
+        for var_name in sorted(bound.keys()):
+            inst, view_cls = bound[var_name]
 
             runtime_cls = inst.cls
             runtime_base = runtime_cls.base.name if runtime_cls.base else "None"
-            fields_str = ", ".join(f"{k}={v}" for k, v in inst.fields.items())
+            fields_str = ", ".join(
+                f"{k}={v}" for k, v in zip(runtime_cls.all_fields(), inst.fields)
+            )
 
             print(f"Instance {var_name}:")
             print(f"  view type    : {view_cls.name}")
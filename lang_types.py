@@ -1,22 +1,44 @@
 # lang_types.py
-# Osnovne strukture: definicija klase i instance, plus pomoćna funkcija za int.
+# Osnovne strukture: definicija klase i instance, kodovi naredbi,
+# plus pomoćna funkcija za int.
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Optional
-import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+import sys
 
-_INT_RE = re.compile(r"-?\d+$")
+# Kodovi (opcode) prevedenih naredbi. Parser svaku naredbu prevodi jednom
+# u torku čiji je prvi element jedan od ovih kodova, npr.
+# (OP_LET_NEW, indeks promenljive, ClassDef, (1, 2)); imena klasa su već
+# razrešena u ClassDef reference, a interpreter po kodu bira obradu.
+OP_LET_NEW = 0
+OP_LET_CLONE = 1
+OP_LET_CAST = 2
+OP_LET_ALIAS = 3
+OP_FIELD_ASSIGN = 4
+OP_CALL = 5
+OP_IS = 6
+
+# Token metode: (True, int literal) ili (False, ime polja);
+# za naredbu call parser od tokena pravi šablon sa indeksima polja.
+MethodToken = Tuple[bool, Union[int, str]]
 
 
 def is_int(tok: str) -> bool:
     """
     Proverava da li je token ceo broj (npr. '5', '-3').
     """
-    return bool(_INT_RE.match(tok))
+    return tok[1:].isdecimal() if tok[:1] == "-" else tok.isdecimal()
+
+
+def method_token(tok: str) -> MethodToken:
+    """
+    Razvrstava token metode: int literal ili (internovano) ime polja.
+    """
+    return (True, int(tok)) if is_int(tok) else (False, sys.intern(tok))
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassDef:
     """
     Opis jedne klase u jeziku.
@@ -24,54 +46,121 @@ class ClassDef:
     name      - ime klase (npr. 'A')
     base_name - ime bazne klase (string), razrešava se kasnije u base
     fields    - lista polja koja OVA klasa uvodi
-    methods   - mapa: ime metode -> lista tokena koje ispisuje
+    methods   - mapa: ime metode -> lista tokena koje ispisuje (kako su napisani)
     base      - referenca na baznu klasu (ClassDef) ili None
+    vtable    - sve metode vidljive kroz klasu (nasleđene + sopstvene),
+                izvedena klasa pregazi istoimenu metodu baze;
+                tokeni su razvrstani na literale i imena polja (method_token)
     """
     name: str
     base_name: Optional[str]
     fields: List[str]
     methods: Dict[str, List[str]]
     base: Optional["ClassDef"] = None  # popuni se posle parsiranja
+    # keševi, popunjava ih resolve(); None znači da klasa nije razrešena
+    vtable: Optional[Dict[str, List[MethodToken]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _all_fields_tuple: Optional[Tuple[str, ...]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # id() ove klase i svih njenih baza
+    _ancestors: Optional[frozenset] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # ime polja -> indeks (slot) u Instance.fields
+    _field_index: Optional[Dict[str, int]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def resolve(self) -> None:
+        """
+        Popunjava keševe klase (polja, indekse polja, pretke i vtable).
+        Baza (ako postoji) mora već biti razrešena, pa se klase
+        razrešavaju redom po dubini nasleđivanja.
+        Izvedena klasa ne sme ponovo definisati polje baze.
+        """
+        base = self.base
+        if base is None:
+            inherited: Tuple[str, ...] = ()
+            ancestors = frozenset((id(self),))
+            vtable: Dict[str, List[MethodToken]] = {}
+        else:
+            inherited = base.all_fields()
+            ancestors = base._ancestors | {id(self)}
+            vtable = dict(base.vtable)
+            for f in self.fields:
+                if f in inherited:
+                    raise ValueError(
+                        f"Field {f} in class {self.name} "
+                        f"already defined in base class"
+                    )
+        for mname, tokens in self.methods.items():
+            vtable[mname] = [method_token(t) for t in tokens]
+        self._all_fields_tuple = inherited + tuple(self.fields)
+        self._field_index = {
+            f: i for i, f in enumerate(self._all_fields_tuple)
+        }
+        self._ancestors = ancestors
+        self.vtable = vtable
+
+    def _unresolved(self) -> ValueError:
+        """
+        Greška za upit nad klasom pre poziva resolve().
+        """
+        return ValueError(f"Class {self.name} is not resolved")
 
-    def all_fields(self) -> List[str]:
+    def all_fields(self) -> Tuple[str, ...]:
         """
         Vraća sva polja klase, uključujući nasleđena (baza pre izvedene).
+        Raspored je isti kao u Instance.fields.
+        """
+        if self._all_fields_tuple is None:
+            raise self._unresolved()
+        return self._all_fields_tuple
+
+    def field_slot(self, name: str) -> Optional[int]:
+        """
+        Vraća indeks polja u Instance.fields, ili None ako polje ne postoji.
         """
-        if self.base is None:
-            return list(self.fields)
-        return self.base.all_fields() + self.fields
+        if self._field_index is None:
+            raise self._unresolved()
+        return self._field_index.get(name)
 
     def is_subclass_of(self, other: "ClassDef") -> bool:
         """
         Proverava da li je ova klasa jednaka ili potklasa zadate.
         """
-        c: Optional[ClassDef] = self
-        while c is not None:
-            if c is other:
-                return True
-            c = c.base
-        return False
-
-    def lookup_method(self, name: str) -> Optional[List[str]]:
+        if self._ancestors is None:
+            raise self._unresolved()
+        return id(other) in self._ancestors
+
+    def lookup_method(self, name: str) -> Optional[List[MethodToken]]:
         """
         Traži metodu u ovoj klasi i bazama (prema hijerarhiji).
         Vraća listu tokena ako postoji, inače None.
         """
-        c: Optional[ClassDef] = self
-        while c is not None:
-            if name in c.methods:
-                return c.methods[name]
-            c = c.base
-        return None
+        if self.vtable is None:
+            raise self._unresolved()
+        return self.vtable.get(name)
 
 
-@dataclass
 class Instance:
     """
     Konkretna instanca objekta.
 
     cls    - stvarna (runtime) klasa objekta
-    fields - mapa: ime polja -> vrednost (int)
+    fields - vrednosti polja (int), redom kao u cls.all_fields();
+             indeks polja daje cls.field_slot()
+
+    Obična klasa sa __slots__ umesto dataclass-a: instance se prave
+    za svaki new i clone, pa je konstruktor sveden na dve dodele.
     """
-    cls: ClassDef
-    fields: Dict[str, int]
+    __slots__ = ("cls", "fields")
+
+    def __init__(self, cls: ClassDef, fields: List[int]):
+        self.cls = cls
+        self.fields = fields
+
+    def __repr__(self) -> str:
+        return f"Instance(cls={self.cls.name}, fields={self.fields})"
@@ -1,15 +1,59 @@
+import io
 import sys
+import time
+from contextlib import redirect_stdout
 from parser import Parser
 from interpreter import Interpreter
 
 
+def bench(classes, statements, var_names, repeat):
+    """
+    Izvršava program repeat puta kroz Interpreter.run() i kroz funkciju
+    iz compile_to_python, ispisuje vremena i proverava da oba načina
+    daju isti izlaz. Vraća False ako se izlazi razlikuju.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        interp = Interpreter(classes, statements, var_names)
+        with redirect_stdout(io.StringIO()) as buf:
+            interp.run()
+    t_run = time.perf_counter() - start
+    expected = buf.getvalue()
+
+    start = time.perf_counter()
+    program = interp.compile_to_python()
+    t_compile = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        insts = [None] * len(var_names)
+        views = [None] * len(var_names)
+        out = []
+        program(insts, views, out.append)
+    t_program = time.perf_counter() - start
+
+    print(f"run()             : {t_run:.4f}s ({repeat}x)")
+    print(f"compile_to_python : {t_compile:.4f}s (1x)")
+    print(f"program()         : {t_program:.4f}s ({repeat}x)")
+    if "".join(out) != expected:
+        print("Error: compile_to_python output differs from run().",
+              file=sys.stderr)
+        return False
+    return True
+
+
 def main():
-    # python -m main put_do_ulaznog_fajla
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <program-file>")
+    # python -m main [--bench N] put_do_ulaznog_fajla
+    args = sys.argv[1:]
+    repeat = None
+    if len(args) == 3 and args[0] == "--bench" and args[1].isdecimal():
+        repeat = int(args[1])
+        args = args[2:]
+    if len(args) != 1 or repeat == 0:
+        print("Usage: python main.py [--bench N] <program-file>")
         return
 
-    filename = sys.argv[1]
+    filename = args[0]
     try:
         with open(filename, "r", encoding="utf-8") as f:
             program = f.read()
@@ -18,9 +62,14 @@ def main():
         return
 
     parser = Parser(program)
-    classes, statements = parser.parse()
+    classes, statements, var_names = parser.parse()
+
+    if repeat is not None:
+        if not bench(classes, statements, var_names, repeat):
+            sys.exit(1)
+        return
 
-    interp = Interpreter(classes, statements)
+    interp = Interpreter(classes, statements, var_names)
     interp.run()
 
     interp.print_classes()
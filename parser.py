@@ -2,69 +2,118 @@
 # Parser za naš mali jezik: čita CLASS blokove i naredbe.
 
 from __future__ import annotations
-from typing import Dict, List, Tuple, Optional
-from lang_types import ClassDef
+import re
+from typing import Dict, Iterator, List, Tuple, Optional
+from lang_types import (
+    ClassDef, MethodToken, is_int,
+    OP_LET_NEW, OP_LET_CLONE, OP_LET_CAST, OP_LET_ALIAS,
+    OP_FIELD_ASSIGN, OP_CALL, OP_IS,
+)
+
+# new A(1, 2, 3, 4)
+# ime klase je sve do razmaka ili "(", kao u zaglavlju CLASS
+_NEW_RE = re.compile(r"new\s+([^\s(]+)\s*\((.*)\)")
+# Jedna linija i njen kraj; krajevi linija su isti kao kod str.splitlines().
+_LINE_RE = re.compile(
+    "([^\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]*)"
+    "(?:\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]|\\Z)"
+)
 
 
 class Parser:
     def __init__(self, src: str):
         self.src = src
         self.classes: Dict[str, ClassDef] = {}
-        self.statements: List[str] = []
+        self.statements: List[tuple] = []
+        # linije izvora (već očišćene od razmaka) i jedna vraćena linija
+        self._lines: Iterator[str] = iter(())
+        self._peek: Optional[str] = None
+        # prva reč naredbe -> prevođenje; ostale naredbe se prepoznaju po sadržaju
+        self._compilers = {
+            "let": self._compile_let,
+            "call": self._compile_call,
+        }
+        # ime promenljive -> indeks u okruženju interpretera
+        self.var_index: Dict[str, int] = {}
+        # view i runtime klasa svake promenljive, poznate statički
+        # tokom prevođenja (jezik nema grananja)
+        self._views: Dict[str, ClassDef] = {}
+        self._runtime: Dict[str, ClassDef] = {}
+        # (id(runtime klase), id(tokena metode)) -> šablon izlazne linije
+        self._call_templates: Dict[Tuple[int, int], str] = {}
 
-    def parse(self) -> Tuple[Dict[str, ClassDef], List[str]]:
+    def parse(self) -> Tuple[Dict[str, ClassDef], List[tuple], List[str]]:
         """
         Glavna ulazna tačka parsiranja.
-        Vraća mapu klasa i listu naredbi.
+        Vraća mapu klasa, listu prevedenih naredbi (opcode torke)
+        i imena promenljivih poređana po indeksu u okruženju.
         """
-        lines = [l.rstrip() for l in self.src.splitlines()]
-        i = 0
+        self._lines = self._iter_lines()
+        self._peek = None
 
         # Prvo parsiramo CLASS blokove.
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line or line.startswith("//") or line.startswith(";"):
-                i += 1
+        while (line := self._next_line()) is not None:
+            if not line or line.startswith(("//", ";")):
                 continue
             if not line.startswith("CLASS "):
+                self._peek = line
                 break
-            i = self._parse_class_block(lines, i)
+            self._parse_class_block(line)
 
         # Ostatak su naredbe (let, call, is, dodela polja).
-        while i < len(lines):
-            line = lines[i].strip()
-            if line and not line.startswith("//") and not line.startswith(";"):
-                self.statements.append(line)
-            i += 1
+        raw_statements: List[str] = []
+        while (line := self._next_line()) is not None:
+            if line and not line.startswith(("//", ";")):
+                raw_statements.append(line)
 
         # Razrešavanje baznih klasa i provera polja.
         self._resolve_bases_and_check_fields()
-        return self.classes, self.statements
 
-    def _parse_class_block(self, lines: List[str], i: int) -> int:
+        # Svaku naredbu prevodimo jednom, da je interpreter ne parsira
+        # ponovo pri svakom izvršavanju.
+        for stmt in raw_statements:
+            op = self._compile_statement(stmt)
+            if op is not None:
+                self.statements.append(op)
+        return self.classes, self.statements, list(self.var_index)
+
+    def _iter_lines(self) -> Iterator[str]:
         """
-        Parsira jedan CLASS blok počevši od linije i.
-        Vraća novi indeks i posle bloka.
+        Lenjo prolazi kroz izvor liniju po liniju, bez pravljenja
+        liste svih linija i bez kopiranja izvora. Svaka linija se očisti
+        od razmaka samo jednom. Linije se prelamaju kao kod str.splitlines().
+        """
+        for m in _LINE_RE.finditer(self.src):
+            yield m.group(1).strip()
+
+    def _next_line(self) -> Optional[str]:
+        """
+        Vraća sledeću liniju (prvo onu vraćenu u _peek), ili None na kraju.
+        """
+        if self._peek is not None:
+            line, self._peek = self._peek, None
+            return line
+        return next(self._lines, None)
+
+    def _parse_class_block(self, header: str) -> None:
         """
-        header = lines[i].strip()        # npr. "CLASS A"
+        Parsira jedan CLASS blok čije je zaglavlje već pročitano
+        (npr. "CLASS A"); ostatak bloka čita iz self._lines.
+        """
+        # linije su već očišćene od razmaka, pa ih ne čistimo ponovo
         _, name = header.split(None, 1)
-        name = name.strip()
 
         base_name: Optional[str] = None
         fields: List[str] = []
         methods: Dict[str, List[str]] = {}
 
-        i += 1
-        while i < len(lines):
-            line_raw = lines[i]
-            line = line_raw.strip()
-
+        while (line := self._next_line()) is not None:
             # Prazna linija označava kraj bloka klase.
             if not line:
-                i += 1
                 break
             # Ako naiđemo na novu CLASS, prethodna se završila.
             if line.startswith("CLASS "):
+                self._peek = line
                 break
 
             if line.startswith("base"):
@@ -79,53 +128,46 @@ class Parser:
                 rb = bracket_part.find("]")
                 if lb >= 0 and rb >= 0:
                     inner = bracket_part[lb + 1:rb]
-                    fields = [f.strip() for f in inner.split(",") if f.strip()]
+                    fields = [f for p in inner.split(",") if (f := p.strip())]
                 else:
                     fields = []
 
             elif line.startswith("methods"):
                 # methods = {
-                i += 1
-                while i < len(lines):
-                    mline = lines[i].strip()
+                while (mline := self._next_line()) is not None:
                     if mline.startswith("}"):
                         break
                     if not mline:
-                        i += 1
                         continue
                     # showB -> [a, b]
                     if "->" in mline:
                         left, right = mline.split("->", 1)
                         mname = left.strip()
-                        rb_part = right.strip()
-                        lb = rb_part.find("[")
-                        rb = rb_part.find("]")
+                        lb = right.find("[")
+                        rb = right.find("]")
                         if lb >= 0 and rb >= 0:
-                            inner = rb_part[lb + 1:rb]
+                            inner = right[lb + 1:rb]
                             # u metodi tokeni mogu biti imena polja ili int literali
-                            tokens = [
-                                t.strip()
-                                for t in inner.replace(",", " ").split()
-                                if t.strip()
-                            ]
+                            tokens = inner.replace(",", " ").split()
                         else:
                             tokens = []
                         methods[mname] = tokens
-                    i += 1
-            i += 1
 
         cls = ClassDef(name=name, base_name=base_name,
                        fields=fields, methods=methods)
         if name in self.classes:
             raise ValueError(f"Class {name} defined multiple times")
         self.classes[name] = cls
-        return i
 
     def _resolve_bases_and_check_fields(self) -> None:
         """
         Posle parsiranja svih klasa:
         - povezujemo base_name u base referencu
-        - proveravamo da izvedena klasa ne redefiniše polja baze.
+        - razrešavamo klase redom po dubini nasleđivanja (ClassDef.resolve):
+          keševi polja, indeksa polja, vtable i predaka, i provera da
+          izvedena klasa ne redefiniše polja baze.
+        Imena polja u metodama se proveravaju tek za naredbu call
+        (_compile_call), prema runtime klasi objekta.
         """
         # Poveži bazne klase.
         for cls in self.classes.values():
@@ -136,14 +178,233 @@ class Parser:
                     )
                 cls.base = self.classes[cls.base_name]
 
-        # Zabrani ponovno definisanje polja iz baze.
-        for cls in self.classes.values():
-            if cls.base is None:
-                continue
-            inherited = set(cls.base.all_fields())
-            for f in cls.fields:
-                if f in inherited:
+        # Baza mora biti obrađena pre izvedene klase, pa klase
+        # sortiramo po dubini nasleđivanja.
+        for cls in sorted(self.classes.values(), key=self._inheritance_depth):
+            cls.resolve()
+
+    def _inheritance_depth(self, cls: ClassDef) -> int:
+        """
+        Vraća broj baza iznad klase (0 za klasu bez baze).
+        Prijavljuje grešku za ciklično nasleđivanje.
+        """
+        depth = 0
+        c = cls.base
+        while c is not None:
+            depth += 1
+            if depth > len(self.classes):
+                raise ValueError(f"Cyclic inheritance for class {cls.name}")
+            c = c.base
+        return depth
+
+    # ------------- prevođenje naredbi -------------
+
+    def _compile_statement(self, stmt: str) -> Optional[tuple]:
+        """
+        Prepoznaje tip naredbe i prevodi je u opcode torku.
+        Uklanja komentare koji počinju sa ';'; prazna naredba daje None.
+        """
+        # ukloni krajnji komentar posle ';' (linija je već očišćena od razmaka)
+        if ";" in stmt:
+            stmt = stmt.split(";", 1)[0].rstrip()
+            if not stmt:
+                return None
+
+        handler = self._compilers.get(stmt.partition(" ")[0])
+        if handler is not None:
+            return handler(stmt)
+
+        if "." in stmt and "=" in stmt:
+            return self._compile_field_assign(stmt)
+
+        if " is " in stmt:
+            return self._compile_is(stmt)
+
+        raise ValueError(f"Unknown statement: {stmt}")
+
+    def _compile_let(self, stmt: str) -> tuple:
+        """
+        Prevodi 'let ime = izraz'.
+        Izrazi koje podržavamo (promenljive su zadate indeksom):
+        - new A(...)    -> (OP_LET_NEW, ime, ClassDef, (argumenti...))
+        - clone a       -> (OP_LET_CLONE, ime, a)
+        - cast<B> a     -> (OP_LET_CAST, ime, ClassDef, a)
+        - let b = a     -> (OP_LET_ALIAS, ime, a)
+        """
+        # let name = expr
+        _, rest = stmt.split("let", 1)
+        name_part, expr_part = rest.split("=", 1)
+        var_name = name_part.strip()
+        expr = expr_part.strip()
+
+        # let a = new A(1, 2, 3, 4)
+        if expr.startswith("new "):
+            m = _NEW_RE.match(expr)
+            if m is None:
+                raise ValueError(f"Invalid constructor call: {expr}")
+            cls = self._get_class(m.group(1))
+            args_str = m.group(2)
+            arg_toks: List[str] = []
+            if args_str.strip():
+                arg_toks = [t.strip() for t in args_str.split(",")]
+            if not all(is_int(tok) for tok in arg_toks):
+                raise ValueError(
+                    "Only int literals allowed as constructor args"
+                )
+            args = tuple(int(tok) for tok in arg_toks)
+            # broj argumenata proveravamo ovde, pa ga interpreter ne proverava
+            n_fields = len(cls.all_fields())
+            if n_fields != len(args):
+                raise ValueError(
+                    f"Class {cls.name} expects {n_fields} args, "
+                    f"got {len(args)}"
+                )
+            # view tip je na početku ista kao runtime klasa
+            return (OP_LET_NEW, self._bind(var_name, cls, cls), cls, args)
+
+        # let c = clone a
+        if expr.startswith("clone "):
+            src_name = expr[6:].lstrip()
+            src = self._get_var(src_name)
+            # clone nasleđuje view i runtime klasu izvora
+            idx = self._bind(
+                var_name, self._views[src_name], self._runtime[src_name]
+            )
+            return (OP_LET_CLONE, idx, src)
+
+        # let c = cast<B> a
+        if expr.startswith("cast<"):
+            after_cast = expr[len("cast<"):]
+            type_part, rest2 = after_cast.split(">", 1)
+            target_cls = self._get_class(type_part.strip())
+            src_name = rest2.strip()
+            src = self._get_var(src_name)
+            runtime_cls = self._runtime[src_name]
+            # Upcast je dozvoljen samo ako je runtime klasa podklasa targeta.
+            if not runtime_cls.is_subclass_of(target_cls):
+                raise ValueError(
+                    f"Cannot cast {runtime_cls.name} to {target_cls.name}"
+                )
+            idx = self._bind(var_name, target_cls, runtime_cls)
+            return (OP_LET_CAST, idx, target_cls, src)
+
+        # let b = a  nova promenljiva koja pokazuje na isti objekat i isti view
+        src_name = expr
+        src = self._get_var(src_name)
+        idx = self._bind(
+            var_name, self._views[src_name], self._runtime[src_name]
+        )
+        return (OP_LET_ALIAS, idx, src)
+
+    def _compile_field_assign(self, stmt: str) -> tuple:
+        """
+        Prevodi 'a.a = 5' u (OP_FIELD_ASSIGN, indeks a, indeks polja a, 5).
+        Polje se traži u runtime klasi promenljive, koja je poznata statički,
+        pa interpreter dodelu izvršava bez provere.
+        """
+        left, right = stmt.split("=", 1)
+        right = right.strip()
+        if not is_int(right):
+            raise ValueError("Only int literals allowed in field assignment")
+
+        var_name, field_name = [p.strip() for p in left.split(".", 1)]
+        idx = self._get_var(var_name)
+        runtime_cls = self._runtime[var_name]
+        slot = runtime_cls.field_slot(field_name)
+        if slot is None:
+            raise ValueError(
+                f"Unknown field {field_name} "
+                f"for instance of {runtime_cls.name}"
+            )
+        return (OP_FIELD_ASSIGN, idx, slot, int(right))
+
+    def _compile_call(self, stmt: str) -> tuple:
+        """
+        Prevodi 'call a.showAll' u (OP_CALL, indeks a, šablon).
+        View i runtime klasa promenljive su poznate statički, pa metodu
+        tražimo odmah i od njenih tokena pravimo šablon za str.format
+        sa indeksima polja runtime klase (_call_template).
+        """
+        _, rest = stmt.split("call", 1)
+        var_part, method_name = [p.strip() for p in rest.split(".", 1)]
+        idx = self._get_var(var_part)
+        view_cls = self._views[var_part]
+
+        # pretraga metoda u view tipu (cast<B> znači "posmatraj kao B")
+        tokens = view_cls.lookup_method(method_name)
+        if tokens is None:
+            raise ValueError(
+                f"Method {method_name} not found in view type {view_cls.name} "
+                f"or its bases"
+            )
+        tmpl = self._call_template(
+            self._runtime[var_part], method_name, tokens
+        )
+        return (OP_CALL, idx, tmpl)
+
+    def _call_template(
+        self, runtime_cls: ClassDef, method_name: str, tokens: List[MethodToken]
+    ) -> str:
+        """
+        Pravi šablon izlazne linije metode za str.format nad poljima
+        instance, npr. [a, 5, x] -> "{0} 5 {2}\\n" (indeksi polja runtime
+        klase). Polje mora postojati u instanci na kojoj se metoda poziva;
+        šablon se pamti po paru (runtime klasa, metoda).
+        """
+        key = (id(runtime_cls), id(tokens))
+        tmpl = self._call_templates.get(key)
+        if tmpl is None:
+            parts: List[str] = []
+            for is_lit, tv in tokens:
+                if is_lit:
+                    # literal je int, pa u njemu nema vitičastih zagrada
+                    parts.append(str(tv))
+                    continue
+                slot = runtime_cls.field_slot(tv)
+                if slot is None:
                     raise ValueError(
-                        f"Field {f} in class {cls.name} "
-                        f"already defined in base class"
+                        f"Unknown field {tv} "
+                        f"in method {method_name}"
                     )
+                parts.append(f"{{{slot}}}")
+            tmpl = self._call_templates[key] = " ".join(parts) + "\n"
+        return tmpl
+
+    def _compile_is(self, stmt: str) -> tuple:
+        """
+        Prevodi 'a is A' u (OP_IS, indeks a, ClassDef A).
+        """
+        var_name, cls_name = [p.strip() for p in stmt.split(" is ", 1)]
+        # nepoznata promenljiva ili klasa nije greška (None), 'is' tada daje ISN'T
+        return (
+            OP_IS,
+            self.var_index.get(var_name),
+            self.classes.get(cls_name),
+        )
+
+    def _get_class(self, name: str) -> ClassDef:
+        """
+        Pribavlja klasu po imenu.
+        """
+        if name not in self.classes:
+            raise ValueError(f"Unknown class {name}")
+        return self.classes[name]
+
+    def _get_var(self, var_name: str) -> int:
+        """
+        Pribavlja indeks već definisane promenljive.
+        """
+        if var_name not in self.var_index:
+            raise ValueError(f"Unknown variable {var_name}")
+        return self.var_index[var_name]
+
+    def _bind(
+        self, var_name: str, view_cls: ClassDef, runtime_cls: ClassDef
+    ) -> int:
+        """
+        Beleži (statički poznatu) view i runtime klasu promenljive i vraća
+        njen indeks; nova promenljiva dobija sledeći slobodan indeks.
+        """
+        self._views[var_name] = view_cls
+        self._runtime[var_name] = runtime_cls
+        return self.var_index.setdefault(var_name, len(self.var_index))